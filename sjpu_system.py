@@ -1,19 +1,174 @@
 import numpy as np
 from scipy.stats import entropy
-from scipy.signal import convolve
-from scipy.special import kl_div
-from control import TransferFunction, forced_response
+from scipy.signal import fftconvolve, bilinear, lfilter
 import mpmath
 import sympy as sp
 import warnings
-from sklearn.cluster import SpectralClustering
 import time
+import os
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from functools import lru_cache
+import math
+from numba import njit, vectorize
 
 try:
     import faiss
 except ImportError:
     faiss = None
 
+@lru_cache(maxsize=32)
+def _bell_coeffs(order):
+    """정규화된 벨 수 계수 (sympy 호출은 order별 1회만)."""
+    c = np.array([float(sp.bell(k)) for k in range(order + 1)])
+    c = (c / c.sum()).astype(np.float32)
+    c.setflags(write=False)
+    return c
+
+@lru_cache(maxsize=32)
+def _gaussian_template(dim):
+    """정규화된 가우시안 벡터 (읽기 전용, dim별 1회 계산)."""
+    vec = np.exp(-np.linspace(-3, 3, dim)**2 / 2)
+    vec = (vec / np.linalg.norm(vec)).astype(np.float32)
+    vec.setflags(write=False)
+    return vec
+
+@vectorize(['float32(float32, float32)'], cache=True)
+def _k_pow_neg_s(log_k, s):
+    """k^(-s) = exp(-s * log k): libm pow 대신 exp 하나로 계산."""
+    return math.exp(-s * log_k)
+
+@lru_cache(maxsize=8)
+def _log_k(dim):
+    """log k, k=1..dim (s_real이 달라도 공유되는 테이블)."""
+    log_k = np.log(np.arange(1, dim + 1, dtype=np.float32))
+    log_k.setflags(write=False)
+    return log_k
+
+@lru_cache(maxsize=64)
+def _zeta_powers(dim, s_real):
+    """k^(-s_real), k=1..dim (읽기 전용, (dim, s_real)별 1회 계산)."""
+    powers = _k_pow_neg_s(_log_k(dim), np.float32(s_real))
+    powers.setflags(write=False)
+    return powers
+
+@njit(fastmath=True, cache=True, nogil=True)
+def _clm(vec, powers, eps, layers):
+    """critical_line_modulation 반복 루프: 제타 곱셈 + 위상 응집도를 레이어당 한 번의 패스로 계산."""
+    modulated = vec.copy()
+    n = vec.size
+    max_coh = 0.0
+    best_layer = 0
+    for layer in range(1, layers + 1):
+        # exp(i*angle(x + eps*i)) = (x + eps*i) / |x + eps*i| 이므로 삼각함수 없이 합산
+        sum_cos = 0.0
+        sum_sin = 0.0
+        for i in range(n):
+            x = modulated[i] * powers[i]
+            modulated[i] = x
+            r = np.sqrt(x * x + eps * eps)
+            sum_cos += x / r
+            sum_sin += eps / r
+        coh = np.sqrt(sum_cos * sum_cos + sum_sin * sum_sin) / n
+        if coh > max_coh:
+            max_coh = coh
+            best_layer = layer
+    return modulated, best_layer
+
+def _pearson(x, y):
+    """두 벡터의 피어슨 상관계수 (corrcoef 행렬 할당 없음). 분산이 0이면 NaN."""
+    x = x - x.mean()
+    y = y - y.mean()
+    nx = np.linalg.norm(x)
+    ny = np.linalg.norm(y)
+    return (x @ y) / (nx * ny) if nx > 0 and ny > 0 else np.nan
+
+@lru_cache(maxsize=32)
+def _resonance_filter(bandwidth, damping):
+    """2차 공진 필터 q/(s^2 + damping*s + q^2)의 쌍선형 이산화 계수 (fs=1)."""
+    q = 1 / bandwidth
+    b, a = bilinear([q], [1, damping, q**2], fs=1.0)
+    return b.astype(np.float32), a.astype(np.float32), q  # lfilter 출력 dtype 유지
+
+@njit(fastmath=True, cache=True, nogil=True)
+def _conv_same(x, h):
+    """scipy.signal.convolve(x, h, mode='same')와 동일한 직접 합성곱 (짧은 필터용)."""
+    n, m = x.size, h.size
+    start = (m - 1) // 2  # full 출력 기준 중앙 정렬 오프셋
+    out = np.zeros(n, dtype=x.dtype)
+    for i in range(n):
+        k = i + start
+        acc = 0.0
+        for j in range(max(0, k - n + 1), min(m, k + 1)):
+            acc += h[j] * x[k - j]
+        out[i] = acc
+    return out
+
+_conv_same(np.zeros(2, np.float32), np.ones(1, np.float32))  # import 시 JIT 워밍업
+_DIRECT_CONV_MAX = 1 << 16  # len(x)*len(h)가 이보다 크면 FFT 합성곱 사용
+
+@njit(cache=True, nogil=True)
+def _alias_build(p):
+    """Vose 별칭 테이블 생성 (O(dim)). 이후 샘플 1개당 O(1)."""
+    size = p.size
+    prob = np.ones(size)
+    alias = np.arange(size)
+    total = p.sum()
+    if total <= 0:
+        return prob, alias  # 확률이 모두 0이면 균등 분포
+    scaled = p * (size / total)
+    small = np.empty(size, np.int64)
+    large = np.empty(size, np.int64)
+    n_small = 0
+    n_large = 0
+    for i in range(size):
+        if scaled[i] < 1.0:
+            small[n_small] = i
+            n_small += 1
+        else:
+            large[n_large] = i
+            n_large += 1
+    while n_small > 0 and n_large > 0:
+        n_small -= 1
+        s = small[n_small]
+        n_large -= 1
+        l = large[n_large]
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = (scaled[l] + scaled[s]) - 1.0
+        if scaled[l] < 1.0:
+            small[n_small] = l
+            n_small += 1
+        else:
+            large[n_large] = l
+            n_large += 1
+    # 남은 항목은 반올림 오차만 있으므로 확률 1 (prob 초기값 유지)
+    return prob, alias
+
+@njit(cache=True, nogil=True)
+def _alias_sample(prob, alias, n, out):
+    """별칭 테이블에서 n개 샘플을 out에 기록."""
+    for i in range(n):
+        k = int(np.random.random() * prob.size)
+        out[i] = k if np.random.random() < prob[k] else alias[k]
+
+@njit(cache=True, nogil=True)
+def _qc(probs, n, eps):
+    """별칭 샘플링 + 히스토그램 + 엔트로피/KL을 한 커널에서 계산."""
+    prob, alias = _alias_build(probs)
+    outcomes = np.empty(n, np.int64)
+    _alias_sample(prob, alias, n, outcomes)
+    hist = np.zeros(probs.size)
+    for k in outcomes:
+        hist[k] += 1.0
+    hist /= n
+    ent = 0.0
+    kl = 0.0
+    for i in range(probs.size):
+        ent -= probs[i] * np.log(probs[i] + eps)
+        kl += hist[i] * np.log((hist[i] + eps) / (probs[i] + eps))
+    return hist, ent, kl
+
 class SJPUConfig:
     MAX_LAYERS = 20
     DEFAULT_SAMPLES = 1000  # 테스트 및 실전 속도 개선을 위해 100000에서 줄임
@@ -22,81 +177,123 @@ class SJPUConfig:
     MAX_DB_SIZE = 10000
     EPSILON = 1e-10
     # FAISS 최적화 파라미터
-    N_CLUSTERS = 32  # IVFFlat 클러스터 수 (검색 속도 최적화)
+    N_CLUSTERS = 64  # IVF 클러스터 수 (학습 벡터 수 / 39 이하 권장)
     N_PROBE = 8  # 검색 시 탐색 클러스터 수 (정확도 vs 속도 균형)
+    TRAIN_SIZE = 4096  # IVF 학습에 사용할 실제 벡터 수 (도달 전까지는 정확 검색)
     HNSW_M = 32  # HNSW 그래프 연결 수 (메모리 vs 속도)
     HNSW_EF_SEARCH = 64  # 검색 시 탐색 깊이
+    WRITE_BUFFER_SIZE = 256  # FAISS 일괄 추가 버퍼 크기 (add 호출 횟수 절감)
+    BENCHMARK_TIMING = False  # add/query 시간 기록 여부 (benchmark_db 실행 중에는 항상 기록)
 
 class SJPUVectorSystem:
     def __init__(self, dim=100, config=None):
         self.dim = dim
         self.config = config or SJPUConfig()
+        self._dtype = np.float32  # 파이프라인 전체 dtype (FAISS 입력과 동일, 변환 복사 제거)
         self._initialize_database()
         self.benchmark_results = {'add_times': [], 'query_times': []}  # 벤치마크 결과 저장
+        self._bench_enabled = self.config.BENCHMARK_TIMING
+
+    @property
+    def knowledge_db(self):
+        """벡터 DB. 버퍼에 남은 벡터를 반영한 뒤 반환 (numpy 폴백은 삽입 순서 배열)."""
+        if self.use_faiss:
+            self._flush()
+            return self._db
+        buf = self._db_buf[:self._db_n]
+        # 링 버퍼가 한 바퀴 돈 경우에만 순서 재배열 복사
+        return buf if self._db_head == 0 else np.concatenate((buf[self._db_head:], buf[:self._db_head]))
 
     def _initialize_database(self):
         """내부 데이터베이스 초기화. faiss 없으면 numpy 폴백."""
-        self.metadata = []
-        self.vectors = []
+        # maxlen 도달 시 deque가 가장 오래된 항목을 O(1)로 자동 제거 (FIFO eviction)
+        self.metadata = deque(maxlen=self.config.MAX_DB_SIZE)
+        self._next_id = 0  # FAISS 벡터 ID 발급 카운터
+        self._id_queue = deque(maxlen=self.config.MAX_DB_SIZE)  # 살아 있는 ID (metadata와 같은 순서)
+        self._indexed_lo = 0  # 인덱스에 남아 있는 가장 오래된 ID
+        buf_size = self.config.WRITE_BUFFER_SIZE
+        self._wbuf = np.empty((buf_size, self.dim), np.float32)
+        self._wbuf_ids = np.empty(buf_size, np.int64)
+        self._wbuf_n = 0
         self.use_faiss = False  # 기본값 False로 설정 (faiss 없어도 동작 보장)
 
         if faiss is not None:
             try:
-                # FAISS 성능 최적화: IndexIVFFlat 사용 (클러스터링으로 검색 속도 향상)
-                quantizer = faiss.IndexFlatL2(self.dim)
-                self.knowledge_db = faiss.IndexIVFFlat(quantizer, self.dim, self.config.N_CLUSTERS)
-                self.knowledge_db.nprobe = self.config.N_PROBE  # 검색 최적화 파라미터
+                # 학습 전에는 정확 검색(Flat) 사용, TRAIN_SIZE 도달 시 실제 벡터로 IVF 학습 (_train_index)
+                # L2 정규화된 벡터의 내적(코사인) 검색: ‖x-q‖² = 2 - 2x·q 이므로 순위는 L2와 동일
+                self._db = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+                self._index_trained = False
+                self._index_params = f"nprobe={self.config.N_PROBE}"  # 학습 후 적용할 검색 파라미터
                 self.use_faiss = True
             except Exception as e:
                 warnings.warn(f"FAISS 초기화 오류: {e}. numpy 폴백 모드로 전환합니다.")
-                self.knowledge_db = np.empty((0, self.dim))
         else:
             warnings.warn(
                 "FAISS를 사용할 수 없습니다. numpy 폴백 모드로 전환합니다.\n"
                 "벡터 검색 성능이 떨어질 수 있습니다. 'faiss-cpu'를 requirements.txt에 추가 후 설치하세요."
             )
-            self.knowledge_db = np.empty((0, self.dim))
 
-        # faiss 사용 여부와 관계없이 knowledge_db shape 보장
-        if not self.use_faiss and self.knowledge_db.size == 0:
-            self.knowledge_db = np.empty((0, self.dim))
+        if not self.use_faiss:
+            # numpy 폴백: 용량 배증 버퍼, MAX_DB_SIZE 도달 후에는 링 버퍼로 가장 오래된 행을 덮어씀
+            self._db_buf = np.empty((min(16, self.config.MAX_DB_SIZE), self.dim), self._dtype)
+            self._row_sqnorms = np.empty(len(self._db_buf), self._dtype)  # 행별 ‖x‖² (검색 시 재사용)
+            self._db_n = 0
+            self._db_head = 0  # 가장 오래된 행의 위치
+
+    def _train_index(self):
+        """누적된 실제 벡터로 IVF 인덱스를 학습하고 기존 벡터를 옮겨 담음."""
+        self._index_trained = True  # 실패 시에도 재시도하지 않음 (Flat 유지)
+        flat = faiss.downcast_index(self._db.index)
+        xb = faiss.vector_to_array(flat.codes).view(np.float32).reshape(-1, self.dim)
+        ids = faiss.vector_to_array(self._db.id_map)
+        try:
+            # PQ FastScan은 remove_ids 후 add_with_ids 시 블록 역리스트가 손상되어 FIFO 제거와 함께 쓸 수 없음
+            index = faiss.index_factory(self.dim, f"IVF{self.config.N_CLUSTERS},Flat", faiss.METRIC_INNER_PRODUCT)
+            index.train(xb)
+            # 해시 direct map: ID 기반 제거 비용을 해당 리스트 길이 수준으로 제한
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            faiss.ParameterSpace().set_index_parameters(index, self._index_params)
+            index.add_with_ids(xb, ids)
+        except Exception as e:
+            warnings.warn(f"IVF 학습 오류: {e}. 정확 검색(Flat) 인덱스를 유지합니다.")
+            return
+        self._db = index
 
-        # FAISS 학습 (초기화 시 클러스터 학습 필요 시)
-        if self.use_faiss and faiss is not None:
-            # 초기 학습 데이터 생성 (임시 벡터로 학습)
-            train_data = np.random.random((self.config.N_CLUSTERS * 10, self.dim)).astype('float32')
-            self.knowledge_db.train(train_data)
+    def set_index_parameters(self, params):
+        """FAISS 검색 파라미터 조정 (예: 'nprobe=16'). 학습 전이면 학습 직후 적용."""
+        self._index_params = params
+        if self.use_faiss and self._index_trained and isinstance(self._db, faiss.IndexIVF):
+            faiss.ParameterSpace().set_index_parameters(self._db, params)
 
     def validate_vector(self, vec):
-        if not isinstance(vec, np.ndarray):
-            vec = np.array(vec)
+        vec = np.ascontiguousarray(vec, dtype=self._dtype)  # 이미 연속 float32면 복사 없음
         if vec.shape[0] != self.dim:
             old_dim = vec.shape[0]
-            if old_dim > self.dim:
-                vec = vec[:self.dim]
-            else:
-                vec = np.pad(vec, (0, self.dim - old_dim), 'constant')
+            resized = np.zeros(self.dim, dtype=self._dtype)  # 자르기/0-패딩을 한 번의 복사로 처리
+            n = min(old_dim, self.dim)
+            resized[:n] = vec[:n]
+            vec = resized
             warnings.warn(f"벡터 크기 {old_dim}에서 {self.dim}으로 조정됨")
-        if not np.isfinite(vec).all():
-            vec = np.nan_to_num(vec)
+        # 정상 경로는 할당 없는 합계 1패스로 검사 (NaN/Inf는 합계로 전파, 합계 오버플로만 원소 단위 재확인)
+        if not np.isfinite(vec.sum()) and not np.isfinite(vec).all():
+            vec = np.nan_to_num(vec, nan=0.0, posinf=0.0, neginf=0.0)  # 호출자 배열은 수정하지 않음
             warnings.warn("NaN/Inf 대체")
         return vec
 
     def generate_vector(self, vec_type='gaussian'):
         if vec_type == 'uniform':
-            vec = np.ones(self.dim) / np.sqrt(self.dim)
+            vec = np.full(self.dim, 1 / np.sqrt(self.dim), dtype=self._dtype)
         elif vec_type == 'gaussian':
-            vec = np.exp(-np.linspace(-3, 3, self.dim)**2 / 2)
-            vec /= np.linalg.norm(vec)
+            vec = _gaussian_template(self.dim)  # 읽기 전용 캐시 반환 (수정 시 .copy() 필요)
         elif vec_type == 'sparse':
             probs = np.array([0.5, 0.2, 0.15, 0.1, 0.05])
-            vec = np.zeros(self.dim)
+            vec = np.zeros(self.dim, dtype=self._dtype)
             vec[:5] = np.sqrt(probs)
         elif vec_type == 'impulse':
-            vec = np.zeros(self.dim)
+            vec = np.zeros(self.dim, dtype=self._dtype)
             vec[0] = 1.0
         else:
-            vec = np.random.normal(0, 1, self.dim)
+            vec = np.random.normal(0, 1, self.dim).astype(self._dtype)
             vec /= np.linalg.norm(vec)  # 명시적 정규화 추가
         return self.validate_vector(vec)
 
@@ -104,18 +301,16 @@ class SJPUVectorSystem:
         vec = self.validate_vector(vec)
         probs = np.abs(vec)**2
         probs /= np.sum(probs) + self.config.EPSILON
-        outcomes = np.random.choice(self.dim, size=self.config.DEFAULT_SAMPLES, p=probs)
-        hist, _ = np.histogram(outcomes, bins=self.dim, density=True)
-        ent = entropy(probs, base=np.e)
-        kl = np.sum(kl_div(hist + self.config.EPSILON, probs + self.config.EPSILON))
+        # 샘플링은 Numba 내부 RNG 사용 (np.random.seed와 별개)
+        hist, ent, kl = _qc(probs, self.config.DEFAULT_SAMPLES, self.config.EPSILON)
         unique = np.sum(hist > 1e-6)
-        corr = np.corrcoef(probs, hist)[0, 1] if np.std(hist) > 0 else np.nan
+        corr = _pearson(probs, hist)
         return {'entropy': ent, 'kl': kl, 'unique': unique, 'corr': corr}
 
     def riemann_zeta_transform(self, vec, s_real=0.5, s_imag=0.0):
         vec = self.validate_vector(vec)
-        k = np.arange(1, self.dim + 1)
-        powers = 1 / np.power(k, s_real)  # NumPy approximation for speed
+        # 실수 경로에서는 |k^(-s)| = k^(-s_real)만 적용되므로 s_imag는 결과에 영향 없음
+        powers = _zeta_powers(self.dim, float(s_real))
         transformed = vec * powers
         amp = np.mean(np.abs(transformed)) / (np.mean(np.abs(vec)) + self.config.EPSILON)
         energy = np.linalg.norm(transformed)**2 / (np.linalg.norm(vec)**2 + self.config.EPSILON)
@@ -124,9 +319,11 @@ class SJPUVectorSystem:
     def bell_transform(self, vec, depth=0.5):
         vec = self.validate_vector(vec)
         order = min(20, max(1, int(depth * 10)))
-        bell_coeffs = np.array([float(sp.bell(k)) for k in range(order + 1)])
-        bell_coeffs /= bell_coeffs.sum() + self.config.EPSILON
-        smoothed = convolve(vec, bell_coeffs, mode='same')
+        bell_coeffs = _bell_coeffs(order)
+        if vec.size * bell_coeffs.size <= _DIRECT_CONV_MAX:
+            smoothed = _conv_same(vec, bell_coeffs)
+        else:
+            smoothed = fftconvolve(vec, bell_coeffs, mode='same')
         vec_var = np.var(np.diff(vec)) + self.config.EPSILON
         smooth_var = np.var(np.diff(smoothed)) + self.config.EPSILON
         improve = vec_var / smooth_var
@@ -138,17 +335,9 @@ class SJPUVectorSystem:
         max_layers = max_layers or self.config.MAX_LAYERS
         ent = entropy(np.abs(vec)**2 + self.config.EPSILON)
         layers = min(max_layers, max(1, int(ent * 2)))
-        modulated = vec.copy()
-        max_coh = 0
-        best_layer = 0
-        for layer in range(1, layers + 1):
-            s_imag = layer * 1.0
-            modulated, _, _ = self.riemann_zeta_transform(modulated, s_imag=s_imag)
-            phase = np.angle(modulated + self.config.EPSILON * 1j)
-            coh = np.abs(np.mean(np.exp(1j * phase)))
-            if coh > max_coh:
-                max_coh = coh
-                best_layer = layer
+        # 레이어별 s_imag는 실수 제타 변환에 영향이 없으므로 (riemann_zeta_transform 참고) 동일한 powers 반복 적용
+        powers = _zeta_powers(self.dim, 0.5)
+        modulated, best_layer = _clm(vec, powers, self.config.EPSILON, layers)
         stability = np.std(modulated) / (np.std(vec) + self.config.EPSILON)
         return modulated, best_layer, stability
 
@@ -156,103 +345,191 @@ class SJPUVectorSystem:
         vec = self.validate_vector(vec)
         bandwidth = bandwidth or self.config.BANDWIDTH
         damping = damping or self.config.DAMPING
-        try:
-            q = 1 / bandwidth
-            sys = TransferFunction([q], [1, damping, q**2])
-            t = np.arange(self.dim)
-            t_out, filtered, _ = forced_response(sys, T=t, U=vec)
-            if len(filtered) != self.dim:
-                filtered = np.interp(np.arange(self.dim), np.linspace(0, self.dim - 1, len(filtered)), filtered)
-            filtered = np.nan_to_num(filtered)
-            eff = np.linalg.norm(filtered)**2 / (np.linalg.norm(vec)**2 + self.config.EPSILON)
-            return filtered, q, eff
-        except Exception as e:
-            warnings.warn(f"Resonance error: {e}")
-            return vec, 1.0, 1.0
+        b, a, q = _resonance_filter(bandwidth, damping)
+        filtered = lfilter(b, a, vec)
+        eff = np.linalg.norm(filtered)**2 / (np.linalg.norm(vec)**2 + self.config.EPSILON)
+        return filtered, q, eff
 
-    def adaptive_process_pipeline(self, vec_type='sparse', adaptive=True):
-        vec = self.generate_vector(vec_type)
-        if adaptive:
-            similar, dists = self.query_db(vec, k=5)
-            if len(similar) > 0:
-                vectors = [m['vector'] for m in similar if 'vector' in m]
-                vectors.append(vec)
-                affinity = np.corrcoef(vectors)
-                sc = SpectralClustering(n_clusters=2, affinity='precomputed')
-                labels = sc.fit_predict(affinity)
-                assoc_score = np.mean(np.abs(labels[:-1]))
-                self.config.BANDWIDTH = 0.05 / (1 + assoc_score)
-                self.config.DAMPING = 0.1 * (1 + assoc_score)
+    def _adaptive_params(self, vec):
+        """DB 유사 벡터와의 연관도로 (bandwidth, damping) 계산. 연관 벡터가 없으면 None."""
+        similar, dists = self.query_db(vec, k=5)
+        vectors = [m['vector'] for m in similar if 'vector' in m]
+        if len(vectors) == 0:
+            return None
+        vectors.append(vec)
+        # 2-클러스터 스펙트럴 분할: 라플라시안의 Fiedler 벡터 부호로 분할 (sklearn 대비 오버헤드 제거)
+        # 상관 행렬: 중심화 행렬의 그람 행렬 / 노름 외적 (분산 0인 행은 상관 0으로 처리)
+        X = np.asarray(vectors)
+        X = X - X.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(X, axis=1)
+        affinity = (X @ X.T) / np.maximum(np.outer(norms, norms), self.config.EPSILON)
+        W = np.clip(affinity, 0, None)
+        L = np.diag(W.sum(axis=1)) - W
+        _, v = np.linalg.eigh(L)
+        fiedler = v[:, 1] if v[-1, 1] <= 0 else -v[:, 1]  # 질의 벡터(마지막)가 항상 0번 클러스터
+        labels = (fiedler > 0).astype(int)
+        assoc_score = np.mean(np.abs(labels[:-1]))
+        return 0.05 / (1 + assoc_score), 0.1 * (1 + assoc_score)
+
+    def _process_vector(self, vec, vec_type, bandwidth=None, damping=None):
+        """변환 단계만 수행 (DB 접근 없음, 스레드 병렬 실행 가능)."""
         qc_metrics = self.quantum_collapse_metrics(vec)
         zeta_vec, amp, energy = self.riemann_zeta_transform(vec)
         bell_vec, improve, noise_red = self.bell_transform(zeta_vec)
         mod_vec, coh_layer, stab = self.critical_line_modulation(bell_vec)
-        res_vec, q, eff = self.resonance_pattern(mod_vec)
+        res_vec, q, eff = self.resonance_pattern(mod_vec, bandwidth, damping)
         meta = {
             'type': vec_type, 'qc_metrics': qc_metrics, 'amp': amp, 'energy': energy,
             'improve': improve, 'noise_red': noise_red, 'coh_layer': coh_layer,
             'stab': stab, 'q': q, 'eff': eff, 'vector': vec
         }
-        self.add_to_db(res_vec, meta)
         results = {'amp': amp, 'energy': energy, 'improve': improve, 'noise_red': noise_red,
                    'coh_layer': coh_layer, 'q': q, 'eff': eff, 'stab': stab}
+        return res_vec, meta, results
+
+    def adaptive_process_pipeline(self, vec_type='sparse', adaptive=True):
+        vec = self.generate_vector(vec_type)
+        if adaptive:
+            params = self._adaptive_params(vec)
+            if params is not None:
+                self.config.BANDWIDTH, self.config.DAMPING = params
+        res_vec, meta, results = self._process_vector(vec, vec_type)
+        self.add_to_db(res_vec, meta)
         return res_vec, results
 
+    def adaptive_process_batch(self, vec_types, adaptive=True, max_workers=None):
+        """여러 벡터를 스레드 풀에서 병렬 처리 (Numba 커널은 nogil).
+
+        적응 파라미터는 배치 시작 시점의 DB 기준으로 계산되며, 결과는 입력 순서대로 DB에 추가됨.
+        """
+        vecs = [self.generate_vector(t) for t in vec_types]
+        # 순차 파이프라인과 동일하게, 연관 벡터가 없으면 직전 파라미터를 이어서 사용
+        bandwidth, damping = self.config.BANDWIDTH, self.config.DAMPING
+        bandwidths, dampings = [], []
+        for vec in vecs:
+            params = self._adaptive_params(vec) if adaptive else None
+            if params is not None:
+                bandwidth, damping = params
+            bandwidths.append(bandwidth)
+            dampings.append(damping)
+        self.config.BANDWIDTH, self.config.DAMPING = bandwidth, damping
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            outputs = list(executor.map(self._process_vector, vecs, vec_types, bandwidths, dampings))
+        for res_vec, meta, _ in outputs:
+            self.add_to_db(res_vec, meta)
+        return [(res_vec, results) for res_vec, _, results in outputs]
+
     def add_to_db(self, vec, meta):
-        start_time = time.time()  # 벤치마크 시작
-        vec = self.validate_vector(vec)
-        vec_f32 = vec.astype(np.float32)
-        if self.use_faiss:
-            if self.knowledge_db.ntotal >= self.config.MAX_DB_SIZE:
-                self.metadata.pop(0)
-                self.vectors.pop(0)
-                self.knowledge_db = faiss.IndexIVFFlat(faiss.IndexFlatL2(self.dim), self.dim, self.config.N_CLUSTERS)
-                self.knowledge_db.nprobe = self.config.N_PROBE
-                if self.vectors:
-                    self.knowledge_db.add(np.array(self.vectors).astype(np.float32))
-            self.knowledge_db.add(vec_f32.reshape(1, -1))
-            self.vectors.append(vec_f32)
-            self.metadata.append(meta)
-        else:
-            if len(self.knowledge_db) >= self.config.MAX_DB_SIZE:
-                self.knowledge_db = self.knowledge_db[1:]
-                self.metadata.pop(0)
-            self.knowledge_db = np.vstack((self.knowledge_db, vec_f32.reshape(1, -1))) if self.knowledge_db.size else vec_f32.reshape(1, -1)
-            self.metadata.append(meta)
-        end_time = time.time()
-        self.benchmark_results['add_times'].append(end_time - start_time)  # 추가 시간 기록
+        start_time = time.perf_counter() if self._bench_enabled else None  # 벤치마크 시작
+        try:
+            vec = self.validate_vector(vec)
+            if self.use_faiss:
+                self._wbuf[self._wbuf_n] = vec
+                self._wbuf_ids[self._wbuf_n] = self._next_id
+                self._wbuf_n += 1
+                # 가득 찬 경우 deque append가 논리적 제거를 수행, 인덱스에서의 실제 제거는 _flush에서 일괄 처리
+                self._id_queue.append(self._next_id)
+                self._next_id += 1
+                self.metadata.append(meta)
+                if self._wbuf_n == len(self._wbuf):
+                    self._flush()
+            else:
+                n = self._db_n
+                if n >= self.config.MAX_DB_SIZE:
+                    self._db_buf[self._db_head] = vec
+                    self._row_sqnorms[self._db_head] = vec @ vec
+                    self._db_head = (self._db_head + 1) % n
+                else:
+                    if n == len(self._db_buf):
+                        grown = np.empty((min(2 * n, self.config.MAX_DB_SIZE), self.dim), self._dtype)
+                        grown[:n] = self._db_buf
+                        self._db_buf = grown
+                        self._row_sqnorms = np.resize(self._row_sqnorms, len(grown))
+                    self._db_buf[n] = vec
+                    self._row_sqnorms[n] = vec @ vec
+                    self._db_n += 1
+                self.metadata.append(meta)
+        finally:
+            if start_time is not None:
+                self.benchmark_results['add_times'].append(time.perf_counter() - start_time)
+
+    def _flush(self):
+        """쓰기 버퍼를 한 번의 add_with_ids로 인덱스에 반영하고 제거된 ID를 일괄 삭제."""
+        n = self._wbuf_n
+        if not self.use_faiss or n == 0:
+            return
+        live_lo = self._id_queue[0]
+        buf_lo = int(self._wbuf_ids[0])
+        # 인덱스에 있는 [_indexed_lo, buf_lo) 중 live_lo 이전 ID는 제거 대상 (IVF는 리스트 전체 스캔 1회)
+        stale = np.arange(self._indexed_lo, min(live_lo, buf_lo), dtype=np.int64)
+        if stale.size:
+            self._db.remove_ids(faiss.IDSelectorArray(stale.size, faiss.swig_ptr(stale)))
+        # 버퍼에 머무는 동안 이미 밀려난 벡터는 추가하지 않음
+        skip = min(n, max(0, live_lo - buf_lo))
+        if skip < n:
+            faiss.normalize_L2(self._wbuf[skip:n])
+            self._db.add_with_ids(self._wbuf[skip:n], self._wbuf_ids[skip:n])
+        self._indexed_lo = max(self._indexed_lo, live_lo)
+        self._wbuf_n = 0
+        if not self._index_trained and self._db.ntotal >= self.config.TRAIN_SIZE:
+            self._train_index()
 
     def query_db(self, query_vec, k=3):
-        start_time = time.time()  # 벤치마크 시작
-        query_vec = self.validate_vector(query_vec)
-        query_f32 = query_vec.astype(np.float32).reshape(1, -1)
-        if self.use_faiss:
-            if self.knowledge_db.ntotal == 0:
-                return [], []
-            k = min(k, self.knowledge_db.ntotal)
-            D, I = self.knowledge_db.search(query_f32, k)
-            return [self.metadata[i] for i in I[0]], D[0]
-        else:
-            if len(self.knowledge_db) == 0:
-                return [], []
-            dists = np.linalg.norm(self.knowledge_db - query_f32, axis=1)
-            idx = np.argsort(dists)[:min(k, len(dists))]
-            return [self.metadata[i] for i in idx], dists[idx]
-        end_time = time.time()
-        self.benchmark_results['query_times'].append(end_time - start_time)  # 검색 시간 기록
+        start_time = time.perf_counter() if self._bench_enabled else None  # 벤치마크 시작
+        try:
+            query_vec = self.validate_vector(query_vec)
+            query_f32 = query_vec.reshape(1, -1)
+            if self.use_faiss:
+                self._flush()
+                if self._db.ntotal == 0:
+                    return [], []
+                k = min(k, self._db.ntotal)
+                query_f32 = query_f32.copy()  # normalize_L2는 제자리 연산이므로 호출자 배열 보호
+                faiss.normalize_L2(query_f32)
+                D, I = self._db.search(query_f32, k)
+                if (I[0] < 0).any() and isinstance(self._db, faiss.IndexIVF):
+                    # 탐색 클러스터에 결과가 부족하면 -1 반환 → 전체 클러스터 재탐색
+                    params = faiss.SearchParametersIVF(nprobe=self._db.nlist)
+                    D, I = self._db.search(query_f32, k, params=params)
+                found = I[0] >= 0
+                base_id = self._id_queue[0]  # ID는 연속 발급되므로 metadata 위치 = ID - 가장 오래된 ID
+                dists = np.maximum(2 - 2 * D[0][found], 0)  # 내적 → 제곱 L2 거리 (정규화 벡터 기준)
+                return [self.metadata[i - base_id] for i in I[0][found]], dists
+            else:
+                n = self._db_n
+                if n == 0:
+                    return [], []
+                # ‖x-q‖² = ‖x‖² + ‖q‖² - 2x·q : (N, dim) 임시 배열 없이 BLAS gemv 한 번으로 계산
+                q = query_f32.ravel()
+                d2 = self._row_sqnorms[:n] + q @ q - 2 * (self._db_buf[:n] @ q)
+                k = min(k, n)
+                # 전체 정렬 대신 O(N) 부분 선택 후 k개만 정렬 (k == n이면 선택 단계 생략)
+                part = np.argpartition(d2, k - 1)[:k] if k < n else np.arange(n)
+                idx = part[np.argsort(d2[part])]
+                dists = np.sqrt(np.maximum(d2[idx], 0))  # 반올림 오차로 인한 음수 방지
+                # 버퍼 행 위치 → 삽입 순서(metadata) 위치
+                return [self.metadata[(i - self._db_head) % n] for i in idx], dists
+        finally:
+            if start_time is not None:
+                self.benchmark_results['query_times'].append(time.perf_counter() - start_time)
 
     def get_system_stats(self):
-        db_size = self.knowledge_db.ntotal if self.use_faiss else len(self.knowledge_db)
+        self._flush()
+        db_size = self._db.ntotal if self.use_faiss else self._db_n
         return {'dim': self.dim, 'db_size': db_size, 'max_db_size': self.config.MAX_DB_SIZE, 'using_faiss': self.use_faiss, 'metadata_count': len(self.metadata)}
 
     def benchmark_db(self, num_operations=10):
         """벡터 DB 간략 벤치마크: 추가 및 검색 시간 평균 계산."""
         print("벤치마크 시작: 추가/검색 시간 측정 ({}회 반복)".format(num_operations))
-        for _ in range(num_operations):
-            vec = self.generate_vector('gaussian')
-            meta = {'test': 'benchmark'}
-            self.add_to_db(vec, meta)  # 추가 벤치마크
-            self.query_db(vec, k=3)  # 검색 벤치마크
+        bench_enabled, self._bench_enabled = self._bench_enabled, True
+        try:
+            for _ in range(num_operations):
+                vec = self.generate_vector('gaussian')
+                meta = {'test': 'benchmark'}
+                self.add_to_db(vec, meta)  # 추가 벤치마크
+                self.query_db(vec, k=3)  # 검색 벤치마크
+        finally:
+            self._bench_enabled = bench_enabled
         add_avg = np.mean(self.benchmark_results['add_times']) if self.benchmark_results['add_times'] else 0
         query_avg = np.mean(self.benchmark_results['query_times']) if self.benchmark_results['query_times'] else 0
         print("평균 추가 시간: {:.6f} 초".format(add_avg))
@@ -19,7 +19,6 @@ def test_init(system):
     assert isinstance(system.config, SJPUConfig)
     assert (system.knowledge_db.ntotal == 0 if system.use_faiss else len(system.knowledge_db) == 0)
     assert len(system.metadata) == 0
-    assert len(system.vectors) == 0
 
 # 2. 벡터 생성 테스트
 @pytest.mark.parametrize("vec_type", ["uniform", "gaussian", "sparse", "impulse", "random"])
@@ -28,7 +27,8 @@ def test_generate_vector(system, vec_type):
     assert isinstance(vec, np.ndarray)
     assert vec.shape[0] == system.dim
     assert np.all(np.isfinite(vec))
-    assert np.abs(np.linalg.norm(vec) - 1.0) < 1e-10  # 정규화 확인
+    assert vec.dtype == np.float32
+    assert np.abs(np.linalg.norm(vec) - 1.0) < 10 * np.finfo(vec.dtype).eps  # 정규화 확인 (float32 정밀도)
 
 # 3. 벡터 검증 테스트
 def test_validate_vector(system):
@@ -127,5 +127,94 @@ def test_get_system_stats(system):
     assert stats["db_size"] == 0
     assert stats["max_db_size"] == system.config.MAX_DB_SIZE
 
+# 13. FIFO 제거 테스트 (쓰기 버퍼 크기별)
+@pytest.mark.parametrize("buf_size", [1, 3, 256])
+def test_add_to_db_eviction(system, buf_size):
+    system.config.WRITE_BUFFER_SIZE = buf_size
+    system._initialize_database()
+    n_extra = 4
+    for i in range(system.config.MAX_DB_SIZE + n_extra):
+        system.add_to_db(system.generate_vector("random"), {"id": i})
+    stats = system.get_system_stats()
+    assert stats["db_size"] == system.config.MAX_DB_SIZE
+    assert stats["metadata_count"] == system.config.MAX_DB_SIZE
+    assert system.metadata[0] == {"id": n_extra}
+    results, dists = system.query_db(system.generate_vector("random"), k=system.config.MAX_DB_SIZE)
+    assert sorted(m["id"] for m in results) == list(range(n_extra, n_extra + system.config.MAX_DB_SIZE))
+    assert len(results) == len(dists)
+
+# 14. 검색 결과 정렬 테스트
+def test_query_db_ordering(system):
+    vecs = [system.generate_vector("random") for _ in range(system.config.MAX_DB_SIZE)]
+    for i, v in enumerate(vecs):
+        system.add_to_db(v, {"id": i})
+    for k in [1, 3, system.config.MAX_DB_SIZE]:
+        results, dists = system.query_db(vecs[2], k=k)
+        assert len(results) == k
+        assert results[0]["id"] == 2
+        assert np.all(np.diff(dists) >= 0)
+
+# 15. 실제 벡터 기반 IVF 학습 테스트 (학습 후 FIFO 제거 포함)
+def _assert_self_recall(system, vecs, ids):
+    for i in ids:
+        results, _ = system.query_db(vecs[i], k=1)
+        assert results[0]["id"] == i
+
+def test_index_training():
+    config = SJPUConfig()
+    config.MAX_DB_SIZE = 600
+    config.TRAIN_SIZE = 512
+    config.N_CLUSTERS = 4
+    system = SJPUVectorSystem(dim=20, config=config)
+    if not system.use_faiss:
+        pytest.skip("FAISS 미설치")
+    import faiss
+    system.set_index_parameters("nprobe=4")
+    vecs = np.random.normal(0, 1, (config.MAX_DB_SIZE + 300, system.dim))
+    for i, v in enumerate(vecs):
+        system.add_to_db(v, {"id": i})
+    assert isinstance(system.knowledge_db, faiss.IndexIVF)
+    assert system.get_system_stats()["db_size"] == config.MAX_DB_SIZE
+    # 제거 이후 추가된 벡터를 포함해 살아 있는 모든 벡터가 자기 자신을 찾아야 함
+    _assert_self_recall(system, vecs, range(len(vecs) - config.MAX_DB_SIZE, len(vecs)))
+
+# 15-1. 기본 설정(dim=100)에서 정상 상태 FIFO 제거 후 검색 테스트
+def test_index_steady_state_eviction():
+    config = SJPUConfig()
+    config.MAX_DB_SIZE = config.TRAIN_SIZE + 500
+    system = SJPUVectorSystem(dim=100, config=config)
+    if not system.use_faiss:
+        pytest.skip("FAISS 미설치")
+    import faiss
+    vecs = np.random.normal(0, 1, (config.MAX_DB_SIZE + 2000, system.dim))
+    for i, v in enumerate(vecs):
+        system.add_to_db(v, {"id": i})
+    assert isinstance(system.knowledge_db, faiss.IndexIVF)
+    assert system.get_system_stats()["db_size"] == config.MAX_DB_SIZE
+    _assert_self_recall(system, vecs, range(config.MAX_DB_SIZE, len(vecs)))
+
+# 16. 벤치마크 시간 기록 테스트
+def test_benchmark_timing(system):
+    vec = system.generate_vector("gaussian")
+    system.query_db(vec)
+    assert system.benchmark_results["query_times"] == []  # 기본값: 기록 안 함
+    system._bench_enabled = True
+    system.query_db(vec)  # 빈 DB: 조기 return 경로
+    system.add_to_db(vec, {"test": "timing"})
+    system.query_db(vec)
+    assert len(system.benchmark_results["add_times"]) == 1
+    assert len(system.benchmark_results["query_times"]) == 2
+    assert all(t >= 0 for t in system.benchmark_results["query_times"])
+
+# 17. 배치 병렬 파이프라인 테스트
+def test_adaptive_process_batch(system):
+    vec_types = ["uniform", "gaussian", "sparse", "impulse"]
+    outputs = system.adaptive_process_batch(vec_types, adaptive=True, max_workers=2)
+    assert len(outputs) == len(vec_types)
+    for processed, metrics in outputs:
+        assert processed.shape == (system.dim,)
+        assert metrics["amp"] > 0
+    assert [m["type"] for m in system.metadata] == vec_types
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file